@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 
 import tools
+import specialization
+import parallel
 import sympy as sp
 
-class Consumer(object):
+class Consumer(specialization.Specializable):
     def __init__(self, x, p, benefit, decision_benefit=None,
                  W=None, other=None):
         """A consumer utility has a benefit from acquiring x, plus
@@ -117,19 +119,75 @@ class Consumer(object):
     def benefit_at_p(self, rational=True):
         return self.benefit().subs(self.x, self.demand(rational))
 
+    def variables(self):
+        return [self.x, self.p]
+
+    def expressions(self):
+        return [self._benefit, self._decision_benefit, self._other, self.W]
+
+    def _specialized(self, subs):
+        return SpecializedConsumer(
+            self.x, self.p,
+            sp.simplify(sp.sympify(self._benefit).subs(subs)),
+            decision_benefit=sp.simplify(
+                sp.sympify(self._decision_benefit).subs(subs)),
+            W=sp.sympify(self.W).subs(subs),
+            other=sp.simplify(sp.sympify(self._other).subs(subs)))
+
+
+class SpecializedConsumer(Consumer):
+    """A Consumer with its parameters substituted, as returned by
+    Consumer.specialize.  The demand and the surplus are substituted
+    into the ones of the generic consumer and simplified only once, and
+    evaluated numerically at numeric prices.
+
+    >>> sp.var('x p A')
+    (x, p, A)
+    >>> cu = Consumer(x, p, benefit=2*A*sp.sqrt(x))
+    >>> cu10 = cu.specialize(A=10)
+    >>> cu10.demand_at(p=2)
+    25.0
+    >>> cu.specialize(A=10) is cu10
+    True
+    >>> cu.specializations().stats()['hits']
+    1
+    """
+    @specialization.memoized
+    def demand(self, rational=True):
+        return self._substituted('demand', rational)
+
+    @specialization.memoized
+    def surplus(self, rational=True):
+        return self._substituted('surplus', rational)
+
+    def demand_at(self, p, rational=True):
+        return self._evaluate_at('demand', p, rational)
+
+    def surplus_at(self, p, rational=True):
+        return self._evaluate_at('surplus', p, rational)
 
 class ConsumerAggregate(object):
-    def __init__(self, *consumers):
+    def __init__(self, *consumers, **options):
+        """The demand of the distinct consumers is derived in a pool of
+        options['processes'] processes, if given.
+        """
         self._consumers = consumers
+        self.processes = options.pop('processes', None)
+        if options:
+            raise TypeError('Unknown options %s' % ', '.join(options))
 
     def consumers(self):
         return tools.aggregate_iterator(self._consumers)
 
-    def demand(self, rational=True):
+    def demand(self, rational=True, processes=None):
+        if processes is None:
+            processes = self.processes
+        members = list(self.consumers())
+        demands = parallel.derive_all([consumer for consumer, n in members],
+                                      'demand', (rational,), processes)
         aggregate = sp.Piecewise((0, True))
-        for consumer, n in self.consumers():
-            aggregate = sp.piecewise_fold(aggregate +
-                                          n*consumer.demand(rational))
+        for (consumer, n), demand in zip(members, demands):
+            aggregate = sp.piecewise_fold(aggregate + n*demand)
         return aggregate
 
     def surplus_at(self, p_var, p_at, rational=True):
@@ -4,8 +4,9 @@ import sympy as sp
 from consumer import Consumer, ConsumerAggregate
 from producer import Firm, ProducerAggregate
 import economics.tools as et
+import economics.specialization as es
 
-class Market(object):
+class Market(es.Specializable):
     def __init__(self, q, p, demand, supply, deluded_demand=None):
         self.demand = demand
         self.deluded_demand = deluded_demand
@@ -13,6 +14,16 @@ class Market(object):
         self.p = p
         self.q = q
 
+    @classmethod
+    def from_aggregates(cls, q, p, consumers, producers, processes=None):
+        """The market of the demand of the ConsumerAggregate consumers
+        and the supply of the ProducerAggregate producers, whose
+        members are derived in a pool of processes if given.
+        """
+        return cls(q, p,
+                   consumers.demand(processes=processes),
+                   producers.supply(processes=processes))
+
     def equilibrium(self, rational=True):
         """
         >>> sp.var('x p', positive=True)
@@ -108,6 +119,55 @@ class Market(object):
             return 0
         return self.consumer_surplus() + self.producer_surplus()
 
+    def variables(self):
+        return [self.q, self.p]
+
+    def expressions(self):
+        exprs = [self.demand, self.supply]
+        if self.deluded_demand is not None:
+            exprs.append(self.deluded_demand)
+        return exprs
+
+    def _specialized(self, subs):
+        deluded_demand = self.deluded_demand
+        if deluded_demand is not None:
+            deluded_demand = sp.simplify(deluded_demand.subs(subs))
+        return SpecializedMarket(self.q, self.p,
+                                 sp.simplify(self.demand.subs(subs)),
+                                 sp.simplify(self.supply.subs(subs)),
+                                 deluded_demand)
+
+
+class SpecializedMarket(Market):
+    """A Market with its parameters substituted, as returned by
+    Market.specialize.  The equilibrium and the cost and benefit
+    curves are computed only once, and reused by the surpluses.
+
+    >>> sp.var('q p a', positive=True)
+    (q, p, a)
+    >>> mkt = Market(q, p, demand=a-p, supply=sp.Eq(p, 100))
+    >>> mkt.specialize(a=1000).equilibrium()
+    (100, 900)
+    """
+    @es.memoized
+    def equilibrium(self, rational=True):
+        return Market.equilibrium(self, rational)
+
+    @es.memoized
+    def total_cost(self):
+        return self._substituted('total_cost')
+
+    @es.memoized
+    def total_benefit(self):
+        return self._substituted('total_benefit')
+
+    @es.memoized
+    def total_cost_at_p(self):
+        return self._substituted('total_cost_at_p')
+
+    @es.memoized
+    def total_benefit_at_p(self, rational=True):
+        return self._substituted('total_benefit_at_p', rational)
 
 def _test():
     import doctest
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+import multiprocessing
+import traceback
+import sympy as sp
+
+
+class DerivationError(Exception):
+    """Raised by derive_all, when deriving in a pool of processes,
+    with the agents whose derivation failed as a list of (agent,
+    traceback) pairs.
+    """
+    def __init__(self, failures):
+        self.failures = failures
+        Exception.__init__(self, '; '.join('%r: %s' % failure
+                                           for failure in failures))
+
+def _derive(task):
+    ## Runs in the pool processes.  Exceptions are returned as their
+    ## tracebacks, as not all of them pickle.
+    agent, method, args = task
+    try:
+        return True, getattr(agent, method)(*args)
+    except Exception:
+        return False, traceback.format_exc()
+
+def derive_all(agents, method, args=(), processes=None):
+    """Calls method(*args) on every distinct agent and returns the
+    results in the order of agents.  If processes is more than 1 the
+    calls run in a pool of processes, and every failure is raised
+    together as DerivationError; otherwise they run here, and the
+    first exception propagates as is.  Agents with a
+    prepare_derivation(method, args) method are given the chance to
+    do in this process the work their copies in the pool would repeat.
+
+    >>> sp.var('x p')
+    (x, p)
+    >>> derive_all([x + p, x, x + p], 'diff', (x,), processes=2)
+    [1, 1, 1]
+    """
+    index = {}
+    distinct = []
+    for agent in agents:
+        if id(agent) not in index:
+            index[id(agent)] = len(distinct)
+            distinct.append(agent)
+    if processes is None or processes <= 1 or len(distinct) <= 1:
+        derived = [getattr(agent, method)(*args) for agent in distinct]
+    else:
+        for agent in distinct:
+            if hasattr(agent, 'prepare_derivation'):
+                agent.prepare_derivation(method, args)
+        tasks = [(agent, method, args) for agent in distinct]
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_derive, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+        failures = [(agent, result) for agent, (ok, result)
+                    in zip(distinct, results) if not ok]
+        if failures:
+            raise DerivationError(failures)
+        derived = [result for ok, result in results]
+    return [derived[index[id(agent)]] for agent in agents]
+
+
+def _test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -2,9 +2,11 @@
 
 import sympy as sp
 import tools
+import specialization
+import parallel
 
 
-class Firm(object):
+class Firm(specialization.Specializable):
     """Given a production function q=F(k, l) we can compute the
     minimum cost given q as a function of the cost of k and l, r and
     w.  The solution of the maximization problem is then when the
@@ -87,22 +89,75 @@ class Firm(object):
     def total_cost_at_p(self):
         return self.total_cost().subs(self.q, self.supply())
 
+    def variables(self):
+        return [self.q, self.p]
+
+    def expressions(self):
+        return [self._var_cost, self._SFC, self._FC]
+
+    def _specialized(self, subs):
+        return SpecializedFirm(
+            self.q, self.p,
+            sp.simplify(sp.sympify(self._var_cost).subs(subs)),
+            SFC=sp.sympify(self._SFC).subs(subs),
+            FC=sp.sympify(self._FC).subs(subs))
+
+
+class SpecializedFirm(Firm):
+    """A Firm with its parameters substituted, as returned by
+    Firm.specialize.  The supply, the surplus and the total cost at p
+    are substituted into the ones of the generic firm and simplified
+    only once, and evaluated numerically at numeric prices.
+
+    >>> sp.var('p q a')
+    (p, q, a)
+    >>> f = Firm(q, p, a*q**2, SFC=0, FC=0)
+    >>> '%.2f' % f.specialize(a=0.1).surplus_at(10)
+    '250.00'
+    """
+    @specialization.memoized
+    def supply(self):
+        return self._substituted('supply')
+
+    @specialization.memoized
+    def surplus(self):
+        return self._substituted('surplus')
+
+    @specialization.memoized
+    def total_cost_at_p(self):
+        return self._substituted('total_cost_at_p')
+
+    def supply_at(self, p):
+        return self._evaluate_at('supply', p)
+
+    def surplus_at(self, p):
+        return self._evaluate_at('surplus', p)
 
 class ProducerAggregate(object):
-    def __init__(self, *firms):
+    def __init__(self, *firms, **options):
+        """The supply of the distinct firms is derived in a pool of
+        options['processes'] processes, if given.
+        """
         self._firms = firms
+        self.processes = options.pop('processes', None)
+        if options:
+            raise TypeError('Unknown options %s' % ', '.join(options))
 
     def firms(self):
         return tools.aggregate_iterator(self._firms)
 
-    def supply(self):
+    def supply(self, processes=None):
+        if processes is None:
+            processes = self.processes
+        members = list(self.firms())
+        supplies = parallel.derive_all([firm for firm, n in members],
+                                       'supply', processes=processes)
         aggregate = sp.Piecewise((0, True))
-        for firm, n in self.firms():
-            supply = firm.supply()
+        for (firm, n), supply in zip(members, supplies):
             if isinstance(supply, sp.relational.Relational):
-                aggregate = sp.piecewise_fold(aggregate + firm.supply())
+                aggregate = sp.piecewise_fold(aggregate + supply)
             else:
-                aggregate = sp.piecewise_fold(aggregate + n*firm.supply())
+                aggregate = sp.piecewise_fold(aggregate + n*supply)
         return aggregate
 
     def surplus_at(self, p_var, p_at, rational=True):
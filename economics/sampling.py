@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+import math
+import struct
+import sympy as sp
+import specialization
+from consumer import Consumer, ConsumerAggregate
+from producer import Firm, ProducerAggregate
+from market import Market
+
+
+class Curve(object):
+    """Points sampled from a curve, and the number of evaluations it
+    took to sample them.
+    """
+    def __init__(self, xs, ys, evaluations):
+        self.xs = xs
+        self.ys = ys
+        self.evaluations = evaluations
+
+    def __len__(self):
+        return len(self.xs)
+
+    def points(self):
+        return zip(self.xs, self.ys)
+
+    def to_csv(self, out, header=('x', 'y')):
+        if header:
+            out.write('%s,%s\n' % header)
+        for x, y in self.points():
+            out.write('%r,%r\n' % (x, y))
+
+    def to_binary(self, out):
+        """Writes the number of points as a little-endian unsigned
+        int, followed by the xs and the ys as little-endian doubles.
+        """
+        n = len(self.xs)
+        out.write(struct.pack('<I', n))
+        out.write(struct.pack('<%dd' % n, *self.xs))
+        out.write(struct.pack('<%dd' % n, *self.ys))
+
+    @classmethod
+    def from_binary(cls, source):
+        n = struct.unpack('<I', source.read(4))[0]
+        xs = list(struct.unpack('<%dd' % n, source.read(8*n)))
+        ys = list(struct.unpack('<%dd' % n, source.read(8*n)))
+        return cls(xs, ys, 0)
+
+
+def breakpoints(expr, var, a, b):
+    """The values of var in (a, b) where a condition of a Piecewise
+    in expr changes.
+
+    >>> p = sp.Symbol('p')
+    >>> breakpoints(sp.Piecewise((0, p < 0), (100 - p, p <= 100),
+    ...                          (0, True)), p, -10, 200)
+    [0.0, 100.0]
+    """
+    points = set()
+    for piecewise in sp.sympify(expr).atoms(sp.Piecewise):
+        for _, cond in piecewise.args:
+            if cond in (True, False):
+                continue
+            for rel in cond.atoms(sp.relational.Relational):
+                try:
+                    roots = sp.solve(rel.lhs - rel.rhs, var)
+                except Exception:
+                    ## Not always solvable.  We will rely on the
+                    ## refinement to find the kink.
+                    continue
+                for root in roots:
+                    try:
+                        root = float(root)
+                    except TypeError:
+                        continue
+                    if a < root < b:
+                        points.add(root)
+    return sorted(points)
+
+def sample(expr, var, a, b, tol=1e-3, initial=9, max_depth=12):
+    """Samples expr as a function of var between a and b.  It starts
+    with initial uniformly spaced points plus the Piecewise
+    breakpoints, on both sides of them, and bisects every segment
+    whose midpoint is further than tol times the range of the curve
+    from the straight line, up to max_depth times.
+
+    >>> p = sp.Symbol('p')
+    >>> curve = sample(sp.Piecewise((0, p < 0), (100 - p, p <= 100),
+    ...                             (0, True)), p, -10, 200)
+    >>> (0.0, 100.0) in curve.points(), (100.0, 0.0) in curve.points()
+    (True, True)
+    >>> curve.evaluations
+    25
+    """
+    expr = sp.sympify(expr)
+    if isinstance(expr, sp.relational.Relational):
+        raise ValueError('Cannot sample the relationship %s' % expr)
+    if not expr.free_symbols <= set([var]):
+        raise ValueError('%s depends on more than %s' % (expr, var))
+    fn = specialization.compile_at(var, expr)
+    if fn is None:
+        raise ValueError('Cannot compile %s for numeric evaluation' % expr)
+    a, b = float(a), float(b)
+    delta = (b - a) * 1e-9
+    xs = set(a + (b - a) * i / (initial - 1.) for i in range(initial))
+    for bp in breakpoints(expr, var, a, b):
+        xs.update([bp - delta, bp, bp + delta])
+    xs = sorted(xs)
+
+    values = {}
+    def at(x):
+        if x not in values:
+            try:
+                values[x] = float(fn(x))
+            except (ZeroDivisionError, OverflowError, ValueError):
+                values[x] = float('nan')
+        return values[x]
+
+    finite = [y for y in map(at, xs) if not _nonfinite(y)]
+    scale = tol * max(max(finite) - min(finite), 1e-12) if finite else 0
+    pending = [(x0, x1, 0) for x0, x1 in zip(xs, xs[1:])]
+    while pending:
+        x0, x1, depth = pending.pop()
+        if depth >= max_depth or x1 - x0 <= 2*delta:
+            continue
+        y0, y1 = at(x0), at(x1)
+        xm = (x0 + x1) / 2.
+        ym = at(xm)
+        if _nonfinite(y0) or _nonfinite(y1) or _nonfinite(ym):
+            ## Next to a pole.  Keep bisecting while the midpoint is
+            ## finite, or has finite neighbours: the finite half is
+            ## refined as usual, and the other one gets closer to the
+            ## pole, up to max_depth.
+            if _nonfinite(ym) and (_nonfinite(y0) or _nonfinite(y1)):
+                continue
+        elif abs(ym - (y0 + y1) / 2.) <= scale:
+            continue
+        pending.append((x0, xm, depth + 1))
+        pending.append((xm, x1, depth + 1))
+
+    xs = sorted(values)
+    return Curve(xs, [values[x] for x in xs], len(values))
+
+def _nonfinite(y):
+    return math.isnan(y) or math.isinf(y)
+
+def curve_of(model, curve=None, rational=True):
+    """Returns the variable and the expression of a curve of a
+    Consumer, Firm, their aggregates or a Market.  The curve is one of
+    'demand', 'supply' or 'surplus', by default the demand of
+    consumers and markets and the supply of producers.  The surplus of
+    aggregates is, as in their surplus_at, the integral of their curve
+    from p, and the surplus of a market is its social surplus as a
+    function of the quantity.
+    """
+    if isinstance(model, (Consumer, ConsumerAggregate)):
+        curve = curve or 'demand'
+        if curve == 'demand':
+            return _price(model), model.demand(rational)
+        if curve == 'surplus':
+            if isinstance(model, Consumer):
+                return model.p, model.surplus(rational)
+            p = _price(model)
+            return p, _integral(model.demand(rational), p, p, sp.oo)
+    elif isinstance(model, (Firm, ProducerAggregate)):
+        curve = curve or 'supply'
+        if curve == 'supply':
+            return _price(model), model.supply()
+        if curve == 'surplus':
+            if isinstance(model, Firm):
+                return model.p, model.surplus()
+            p = _price(model)
+            return p, _integral(model.supply(), p, 0, p)
+    elif isinstance(model, Market):
+        curve = curve or 'demand'
+        if curve == 'demand':
+            if rational:
+                return model.p, model.demand
+            if model.deluded_demand is not None:
+                return model.p, model.deluded_demand
+        if curve == 'supply':
+            return model.p, model.supply
+        if curve == 'surplus':
+            return model.q, model.social_surplus()
+    raise ValueError('No %s curve for %s' % (curve, model))
+
+def _integral(expr, var, a, b):
+    ## The integral of expr over var from a to b, where the limits
+    ## may themselves be var.
+    t = sp.Dummy()
+    return sp.integrate(expr.subs(var, t), (t, a, b))
+
+def sample_curve(model, a, b, curve=None, rational=True, **options):
+    """Samples a curve of a model, as returned by curve_of, for values
+    of its variable between a and b: prices for all curves but the
+    surplus of a market, which is a function of the quantity.  The
+    options are passed to sample.
+    """
+    var, expr = curve_of(model, curve, rational)
+    return sample(expr, var, a, b, **options)
+
+def _price(model):
+    ## Aggregates take the price from their members.
+    if isinstance(model, ConsumerAggregate):
+        members = model.consumers()
+    elif isinstance(model, ProducerAggregate):
+        members = model.firms()
+    else:
+        return model.p
+    for member, n in members:
+        return member.p
+
+
+def _test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == "__main__":
+    _test()
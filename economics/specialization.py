@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+
+import inspect
+import sympy as sp
+
+
+class LRUCache(object):
+    """A bounded least-recently-used mapping.  Every entry has a
+    weight, given by the function weigh (1 by default), and the cache
+    evicts the least recently used entries whenever it holds more
+    than maxsize entries or more than max_weight total weight.
+
+    >>> cache = LRUCache(maxsize=2)
+    >>> cache.put('a', 1)
+    >>> cache.put('b', 2)
+    >>> cache.get('a')
+    1
+    >>> cache.put('c', 3)
+    >>> 'b' in cache, 'a' in cache
+    (False, True)
+    >>> sorted(cache.stats().items())
+    [('entries', 2), ('evictions', 1), ('hits', 1), ('misses', 0), ('weight', 2)]
+    """
+    def __init__(self, maxsize=32, max_weight=None, weigh=None):
+        self.maxsize = maxsize
+        self.max_weight = max_weight
+        if weigh is None:
+            weigh = lambda value: 1
+        self._weigh = weigh
+        self._entries = {}
+        self._order = []
+        self._weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._order.remove(key)
+        self._order.append(key)
+        return self._entries[key][0]
+
+    def put(self, key, value):
+        if key in self._entries:
+            self._discard(key)
+        weight = self._weigh(value)
+        self._entries[key] = (value, weight)
+        self._order.append(key)
+        self._weight += weight
+        self._evict()
+
+    def reweigh(self, key):
+        """Weighs again the entry for key, whose value has grown, and
+        evicts as needed.
+        """
+        if key not in self._entries:
+            return
+        value, weight = self._entries[key]
+        new_weight = self._weigh(value)
+        self._entries[key] = (value, new_weight)
+        self._weight += new_weight - weight
+        self._evict()
+
+    def clear(self):
+        self._entries.clear()
+        self._order = []
+        self._weight = 0
+
+    def stats(self):
+        return {'entries': len(self._entries),
+                'weight': self._weight,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions}
+
+    def _evict(self):
+        while len(self._order) > 1 and self._over_limit():
+            self._discard(self._order[0])
+            self.evictions += 1
+
+    def _over_limit(self):
+        if len(self._order) > self.maxsize:
+            return True
+        return self.max_weight is not None and self._weight > self.max_weight
+
+    def _discard(self, key):
+        value, weight = self._entries.pop(key)
+        self._order.remove(key)
+        self._weight -= weight
+
+def expression_size(*exprs):
+    """Number of nodes in the expression trees, as a rough measure of
+    the memory they take.
+
+    >>> sp.var('x p')
+    (x, p)
+    >>> expression_size(x + p, 2*x)
+    6
+    """
+    size = 0
+    for expr in exprs:
+        size += sum(1 for _ in sp.preorder_traversal(sp.sympify(expr)))
+    return size
+
+def compile_at(var, expr):
+    """Compiles expr into a numeric function of var, or returns None
+    if expr depends on anything else.
+    """
+    expr = sp.sympify(expr)
+    if isinstance(expr, sp.relational.Relational):
+        return None
+    if not expr.free_symbols <= set([var]):
+        return None
+    try:
+        return sp.lambdify(var, expr)
+    except Exception:
+        return None
+
+def memoized(method):
+    """Caches the results of a method in the _memo dictionary of its
+    instance, keyed by the method name and the arguments, with the
+    defaults filled in so that f() and f(default) share the entry.
+    The instance is told with _memo_filled() when the cache grows.
+    """
+    def wrapper(self, *args, **kwargs):
+        callargs = inspect.getcallargs(method, self, *args, **kwargs)
+        del callargs['self']
+        key = (method.__name__, tuple(sorted(callargs.items())))
+        memo = self.__dict__.setdefault('_memo', {})
+        if key not in memo:
+            memo[key] = method(self, *args, **kwargs)
+            self._memo_filled()
+        return memo[key]
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+def _weight(value):
+    ## Expression nodes held by a cached value.
+    if isinstance(value, (tuple, list)):
+        return sum(_weight(v) for v in value)
+    if isinstance(value, sp.Basic):
+        return expression_size(value)
+    return 0
+
+
+class Specializable(object):
+    """Mixin for models with free parameters.  specialize(**params)
+    substitutes the parameters, named by the names of their symbols,
+    and returns a specialized model.  Its curves are derived
+    symbolically by this model, only once, and then substituted,
+    simplified and compiled for numeric evaluation.  Specialized models
+    are kept in a bounded LRU cache keyed by the parameter values and
+    weighed by the expression nodes they hold, derived curves
+    included.  Its stats are available with specializations().stats().
+
+    Subclasses have a price p, and implement variables(), returning
+    the variables of the model, expressions(), returning the
+    expressions that define it, and _specialized(subs), returning the
+    model with the substitutions subs applied.
+    """
+    specialization_cache_size = 32
+    specialization_max_weight = None
+
+    def specializations(self):
+        if getattr(self, '_specializations', None) is None:
+            self._specializations = LRUCache(
+                maxsize=self.specialization_cache_size,
+                max_weight=self.specialization_max_weight,
+                weigh=lambda model: model.weight())
+        return self._specializations
+
+    def parameters(self):
+        """The free symbols of the model other than its variables, by
+        name.
+        """
+        symbols = set()
+        for expr in self.expressions():
+            symbols |= sp.sympify(expr).free_symbols
+        symbols -= set(self.variables())
+        return dict((str(s), s) for s in symbols)
+
+    def specialize(self, **params):
+        key = tuple(sorted(params.items()))
+        cache = self.specializations()
+        model = cache.get(key)
+        if model is None:
+            symbols = self.parameters()
+            subs = {}
+            for name, value in params.items():
+                if name not in symbols:
+                    raise ValueError('Unknown parameter %s' % name)
+                subs[symbols[name]] = value
+            model = self._specialized(subs)
+            model._generic = self
+            model._subs = subs
+            cache.put(key, model)
+            model._cache_entry = (cache, key)
+        return model
+
+    def weight(self):
+        """Expression nodes held by the model and its cached curves."""
+        return (expression_size(*self.expressions()) +
+                sum(_weight(v) for v in getattr(self, '_memo', {}).values()))
+
+    @memoized
+    def generic(self, curve, *args):
+        """The curve, derived symbolically, with the parameters free."""
+        return getattr(self, curve)(*args)
+
+    def _substituted(self, curve, *args):
+        ## The curve of the generic model, specialized.
+        generic = self._generic.generic(curve, *args)
+        if generic is None:
+            return None
+        return sp.simplify(sp.sympify(generic).subs(self._subs))
+
+    def _evaluate_at(self, curve, at, *args):
+        ## Evaluates the curve at p=at, with the compiled curve if at
+        ## is a plain number.  Compiled curves are kept out of _memo,
+        ## to skip memoized on this hot path, and out of the weight, as
+        ## the curves they compile are already in it.
+        key = (curve,) + args
+        compiled = self.__dict__.setdefault('_compiled', {})
+        if key not in compiled:
+            compiled[key] = compile_at(self.p, getattr(self, curve)(*args))
+        fn = compiled[key]
+        if fn is not None and isinstance(at, (int, long, float)):
+            return float(fn(at))
+        return getattr(self, curve)(*args).subs(self.p, at)
+
+    def _memo_filled(self):
+        entry = getattr(self, '_cache_entry', None)
+        if entry is not None:
+            cache, key = entry
+            cache.reweigh(key)
+
+    def prepare_derivation(self, curve, args):
+        """Derives the generic curve of a specialized model, so that
+        copies of it sent to other processes carry it along.
+        """
+        generic = getattr(self, '_generic', None)
+        if generic is not None:
+            generic.generic(curve, *args)
+
+    def __getstate__(self):
+        ## Compiled functions and the cache of specializations do not
+        ## pickle.  The memo holds only expressions, and is kept.
+        state = self.__dict__.copy()
+        state.pop('_specializations', None)
+        state.pop('_cache_entry', None)
+        state.pop('_compiled', None)
+        return state
+
+
+def _test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+import itertools
+import json
+import os
+import shutil
+import numpy as np
+
+
+class ResultStore(object):
+    """Append-only store for the results of large scenario runs.  Rows
+    of numeric columns are buffered in memory and written, every
+    chunk_size rows, as one .npy file per column.  A manifest lists the
+    completed chunks, and is only rewritten once all the files of a
+    chunk are in place, so that after a crash the store holds every
+    completed chunk and a run can resume after its last row.
+
+    >>> import tempfile
+    >>> path = tempfile.mkdtemp()
+    >>> store = ResultStore(path, ['p', 'q'], chunk_size=2)
+    >>> store.run(range(5), lambda p: {'p': p, 'q': 100 - p})
+    >>> resumed = ResultStore(path)
+    >>> len(resumed)
+    5
+    >>> resumed.run(range(7), lambda p: {'p': p, 'q': 100 - p})
+    >>> [len(chunk['q']) for chunk in resumed.chunks()]
+    [2, 2, 1, 2]
+    >>> list(resumed.column('q'))
+    [100.0, 99.0, 98.0, 97.0, 96.0, 95.0, 94.0]
+    >>> shutil.rmtree(path)
+    """
+    manifest_name = 'manifest.json'
+
+    def __init__(self, path, columns=None, chunk_size=None):
+        """Opens the store at path, creating it if there is none.  When
+        reopening, columns and chunk_size, if given, must match the
+        ones of the store; chunk_size defaults to 65536 rows.
+        """
+        self.path = path
+        manifest = os.path.join(path, self.manifest_name)
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                self._manifest = json.load(f)
+            if columns is not None and \
+                    list(columns) != self._manifest['columns']:
+                raise ValueError('Store at %s has columns %s' %
+                                 (path, self._manifest['columns']))
+            if chunk_size is not None and \
+                    chunk_size != self._manifest['chunk_size']:
+                raise ValueError('Store at %s has chunk size %s' %
+                                 (path, self._manifest['chunk_size']))
+        else:
+            if columns is None:
+                raise ValueError('No store at %s, and no columns given' %
+                                 path)
+            for column in columns:
+                ## Column names end up in file names.
+                if os.sep in column or (os.altsep and os.altsep in column):
+                    raise ValueError('Invalid column name %r' % column)
+            if chunk_size is None:
+                chunk_size = 65536
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            self._manifest = {'columns': list(columns),
+                              'chunk_size': chunk_size,
+                              'chunks': []}
+            self._write_manifest()
+        self._buffer = []
+
+    def __len__(self):
+        return self.completed() + len(self._buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def columns(self):
+        return self._manifest['columns']
+
+    def completed(self):
+        """Number of rows in completed chunks."""
+        return sum(chunk['rows'] for chunk in self._manifest['chunks'])
+
+    def append(self, row):
+        """Appends a row, given as a dictionary with a value for every
+        column.  None, as in the equilibrium of a market that has
+        none, is stored as NaN.
+        """
+        self._buffer.append([_value(row[c]) for c in self.columns()])
+        if len(self._buffer) >= self._manifest['chunk_size']:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        index = len(self._manifest['chunks'])
+        values = np.array(self._buffer, dtype=np.float64)
+        for i, column in enumerate(self.columns()):
+            name = self._chunk_file(index, column)
+            tmp = name + '.tmp'
+            with open(tmp, 'wb') as f:
+                np.save(f, values[:, i])
+                _sync(f)
+            os.rename(tmp, name)
+        self._manifest['chunks'].append({'rows': len(self._buffer)})
+        self._write_manifest()
+        self._buffer = []
+
+    def run(self, scenarios, evaluate):
+        """Appends evaluate(scenario) for every scenario, skipping the
+        ones already in the store.  The results of the last, partial
+        chunk are flushed at the end.
+        """
+        for scenario in itertools.islice(scenarios, len(self), None):
+            self.append(evaluate(scenario))
+        self.flush()
+
+    def chunks(self):
+        """Iterates over the completed chunks as dictionaries of
+        memory-mapped, read-only column arrays.
+        """
+        for index in range(len(self._manifest['chunks'])):
+            yield dict((column, np.load(self._chunk_file(index, column),
+                                        mmap_mode='r'))
+                       for column in self.columns())
+
+    def column(self, name):
+        """The whole column of completed chunks, copied into memory."""
+        parts = [chunk[name] for chunk in self.chunks()]
+        if not parts:
+            return np.zeros(0)
+        return np.concatenate(parts)
+
+    def _chunk_file(self, index, column):
+        return os.path.join(self.path, 'chunk-%06d-%s.npy' % (index, column))
+
+    def _write_manifest(self):
+        manifest = os.path.join(self.path, self.manifest_name)
+        tmp = manifest + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._manifest, f)
+            _sync(f)
+        os.rename(tmp, manifest)
+        ## Makes the renames themselves durable.
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _value(value):
+    if value is None:
+        return float('nan')
+    return float(value)
+
+def _sync(f):
+    ## The data must be on disk before the rename that publishes it.
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == "__main__":
+    _test()
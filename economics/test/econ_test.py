@@ -3,21 +3,35 @@
 
 from test_consumer import ConsumerTest
 from test_producer import ProducerTest
+from test_market import MarketTest
+from test_sampling import SamplingTest
+from test_store import StoreTest
 
 import economics.tools
+import economics.specialization
+import economics.parallel
 import economics.consumer
 import economics.producer
 import economics.market
+import economics.sampling
+import economics.store
 
 import unittest, doctest
 
 def suite():
     tests = [unittest.TestLoader().loadTestsFromTestCase(ConsumerTest),
              unittest.TestLoader().loadTestsFromTestCase(ProducerTest),
+             unittest.TestLoader().loadTestsFromTestCase(MarketTest),
+             unittest.TestLoader().loadTestsFromTestCase(SamplingTest),
+             unittest.TestLoader().loadTestsFromTestCase(StoreTest),
              doctest.DocTestSuite(economics.tools),
+             doctest.DocTestSuite(economics.specialization),
+             doctest.DocTestSuite(economics.parallel),
              doctest.DocTestSuite(economics.consumer),
              doctest.DocTestSuite(economics.producer),
-             doctest.DocTestSuite(economics.market)]
+             doctest.DocTestSuite(economics.market),
+             doctest.DocTestSuite(economics.sampling),
+             doctest.DocTestSuite(economics.store)]
     return unittest.TestSuite(tests)
 
 if __name__ == '__main__':
@@ -3,6 +3,8 @@ import unittest
 
 from economics.consumer import Consumer, ConsumerAggregate
 import economics.tools as et
+import economics.parallel as ep
+import economics.sampling as sampling
 
 
 class ConsumerTest(unittest.TestCase):
@@ -29,13 +31,56 @@ class ConsumerTest(unittest.TestCase):
         """
         sp.var('x p W')
         benefit = et.benefit_from_demand(x, p, 100 - p)
-        sp.plot(benefit, (x, 0, 100))
+        self.assertEqual(sampling.sample(benefit, x, 0, 100).ys[-1], 5000)
 
         cons = Consumer(x, p, benefit)
         cons_sub = Consumer(x, p, benefit, other=W - x*p/2)
         self.assertEqual(cons_sub.surplus().subs(p, 50) - cons.surplus().subs(p, 50),
                          1562.5)
 
+    def test_specialize(self):
+        sp.var('A x p')
+        cons = Consumer(x, p, 2*A * sp.sqrt(x))
+        cons10 = cons.specialize(A=10)
+        self.assertTrue(cons.specialize(A=10) is cons10)
+        self.assertAlmostEqual(cons10.surplus_at(2),
+                               float(cons.surplus_at(2).subs(A, 10)))
+        self.assertEqual(cons10.surplus_at(2*p),
+                         cons10.surplus().subs(p, 2*p))
+        self.assertRaises(ValueError, cons.specialize, B=1)
+        self.assertRaises(ValueError, cons.specialize, p=2)
+        stats = cons.specializations().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 3))
+
+    def test_specialize_memo(self):
+        """The derived curves are cached once, whatever the way the
+        arguments are passed.
+        """
+        sp.var('A x p')
+        cons = Consumer(x, p, 2*A * sp.sqrt(x)).specialize(A=10)
+        cons.demand()
+        cons.demand(True)
+        cons.demand(rational=True)
+        self.assertEqual(len(cons._memo), 1)
+        self.assertEqual(cons.demand_at(2), 25)
+
+    def test_parallel_demand(self):
+        sp.var('x p')
+        consumers = [(Consumer(x, p, (i + 1)*sp.sqrt(x)), 10)
+                     for i in range(4)]
+        serial = ConsumerAggregate(*consumers)
+        parallel = ConsumerAggregate(*consumers, processes=2)
+        self.assertEqual(parallel.demand(), serial.demand())
+        ## processes=0 forces serial work, without a pool.
+        pool = ep.multiprocessing.Pool
+        def no_pool(*args):
+            raise AssertionError('Pool created')
+        ep.multiprocessing.Pool = no_pool
+        try:
+            self.assertEqual(parallel.demand(processes=0), serial.demand())
+        finally:
+            ep.multiprocessing.Pool = pool
+
 
 
 
@@ -32,6 +32,19 @@ class MarketTest(unittest.TestCase):
         market = Market(q, p, 100-p, firm.supply())
         print market.equilibrium()
 
+    def test_parallel_aggregates(self):
+        sp.var('x p q a')
+        consumers = ConsumerAggregate(*[(Consumer(x, p, (i + 1)*sp.sqrt(x)),
+                                         10) for i in range(3)])
+        firm = Firm(q, p, a*q**2, SFC=0, FC=0)
+        producers = ProducerAggregate(*[(firm.specialize(a=(i + 1)/10.), 10)
+                                        for i in range(3)])
+        serial = Market.from_aggregates(x, p, consumers, producers)
+        parallel = Market.from_aggregates(x, p, consumers, producers,
+                                          processes=2)
+        self.assertEqual(parallel.demand, serial.demand)
+        self.assertEqual(parallel.supply, serial.supply)
+
 
 if __name__ == '__main__':
     unittest.main()
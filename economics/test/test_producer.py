@@ -1,8 +1,21 @@
+import os
 import sympy as sp
 import unittest
 
 from economics.producer import Firm, ProducerAggregate
 import economics.tools as et
+import economics.parallel as ep
+from economics.specialization import expression_size
+
+
+class WorkerCheckingFirm(Firm):
+    """A Firm that fails to derive its supply out of the test process."""
+    pid = os.getpid()
+
+    def supply(self):
+        if os.getpid() != self.pid:
+            raise AssertionError('Supply derived in a worker')
+        return Firm.supply(self)
 
 
 class ProducerTest(unittest.TestCase):
@@ -26,5 +39,78 @@ class ProducerTest(unittest.TestCase):
         firm = Firm(q, p, q**2/1000., SFC=0, FC=0)
         self.assertEqual(sp.solve(firm.supply() - 1000, p)[0], 2)
 
+    def test_specialize_eviction(self):
+        sp.var('q p a')
+        firm = Firm(q, p, a*q**2, SFC=0, FC=0)
+        firm.specialization_cache_size = 2
+        for a_at in (0.1, 0.2, 0.1, 0.4):
+            firm.specialize(a=a_at)
+        stats = firm.specializations().stats()
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertAlmostEqual(firm.specialize(a=0.1).surplus_at(10), 250)
+
+    def test_specialize_weight(self):
+        """Derived curves count in the weight of the cache."""
+        sp.var('q p a')
+        firm = Firm(q, p, a*q**2, SFC=0, FC=0)
+        cheap = firm.specialize(a=0.1)
+        weight = firm.specializations().stats()['weight']
+        self.assertAlmostEqual(cheap.supply_at(10), 50)
+        self.assertTrue(firm.specializations().stats()['weight'] > weight)
+        ## Each curve counts once, compiled or not.
+        self.assertEqual(cheap.weight(),
+                         expression_size(*cheap.expressions()) +
+                         expression_size(cheap.supply()))
+        firm.specializations().max_weight = cheap.weight()
+        firm.specialize(a=0.2).supply_at(10)
+        stats = firm.specializations().stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (1, 1))
+
+    def test_parallel_supply(self):
+        sp.var('q p')
+        firms = [(Firm(q, p, variable_cost=(i + 1)*q**2, SFC=0, FC=0), 10)
+                 for i in range(4)]
+        ## Cached specializations do not get in the way of pickling.
+        firms[0][0].specialize()
+        serial = ProducerAggregate(*firms)
+        parallel = ProducerAggregate(*firms, processes=2)
+        self.assertEqual(parallel.supply(), serial.supply())
+
+    def test_parallel_errors(self):
+        sp.var('q p')
+        broken = Firm(q, p, variable_cost=None)
+        agg = ProducerAggregate(Firm(q, p, q**2, SFC=0, FC=0), broken,
+                                processes=2)
+        try:
+            agg.supply()
+        except ep.DerivationError as e:
+            self.assertEqual([firm for firm, error in e.failures], [broken])
+        else:
+            self.fail('DerivationError not raised')
+        self.assertTrue('Traceback' in e.failures[0][1])
+
+    def test_serial_errors(self):
+        """Without a pool, the original exception propagates."""
+        sp.var('q p')
+        agg = ProducerAggregate(Firm(q, p, variable_cost=None))
+        self.assertRaises(TypeError, agg.supply)
+
+    def test_parallel_generic(self):
+        """The generic supply of specialized firms is derived once, in
+        this process, and not again by the pool workers.
+        """
+        sp.var('q p a')
+        firm = WorkerCheckingFirm(q, p, a*q**2, SFC=0, FC=0)
+        firms = [(firm.specialize(a=(i + 1)/10.), 10) for i in range(4)]
+        self.assertEqual(ProducerAggregate(*firms, processes=2).supply(),
+                         ProducerAggregate(*firms).supply())
+        calls = [key for key in firm._memo if key[0] == 'generic']
+        self.assertEqual(len(calls), 1)
+
+    def test_unknown_options(self):
+        self.assertRaises(TypeError, ProducerAggregate, threads=2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,89 @@
+import sympy as sp
+import unittest
+import io
+
+from economics.producer import Firm, ProducerAggregate
+from economics.market import Market
+import economics.sampling as sampling
+
+
+class SamplingTest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_kink(self):
+        """Supply jumps at the shut down price, and the sampler finds
+        it with far fewer points than a uniform grid.
+        """
+        p = sp.Symbol('p')
+        supply = sp.Piecewise((0, p < 10), (500*p, True))
+        curve = sampling.sample(supply, p, 0, 100)
+        self.assertTrue((10.0, 5000.0) in curve.points())
+        self.assertTrue(curve.evaluations < 50)
+
+    def test_pole(self):
+        """A demand with a pole at the edge of the range is refined up
+        to the tolerance next to it.
+        """
+        p = sp.Symbol('p')
+        curve = sampling.sample(10000/p**2, p, 0, 100)
+        points = [(x, y) for x, y in curve.points() if x >= 2]
+        ## The tolerance is relative to the initial range, 10000/12.5**2 - 1.
+        scale = 1e-3 * 63
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            xm = (x0 + x1) / 2.
+            self.assertTrue(abs(10000/xm**2 - (y0 + y1) / 2.) <= scale)
+        self.assertTrue(any(6.25 < x < 12.5 for x in curve.xs))
+
+    def test_curves(self):
+        sp.var('q p')
+        mkt = Market(q, p, demand=1000-p, supply=sp.Eq(p, 100))
+        self.assertEqual(sampling.sample_curve(mkt, 0, 1000,
+                                               curve='demand').ys[-1], 0)
+        self.assertRaises(ValueError, sampling.sample_curve,
+                          mkt, 0, 1000, curve='supply')
+        self.assertRaises(ValueError, sampling.curve_of,
+                          mkt, 'demand', rational=False)
+        agg = ProducerAggregate((Firm(q, p, q**2, SFC=0, FC=0), 10))
+        self.assertRaises(ValueError, sampling.curve_of, agg, 'demand')
+
+    def test_surplus_curves(self):
+        sp.var('q p a')
+        firm = Firm(q, p, a*q**2, SFC=0, FC=0).specialize(a=0.05)
+        agg = ProducerAggregate((firm, 10))
+        self.assertAlmostEqual(sampling.sample_curve(agg, 0, 10,
+                                                     curve='surplus').ys[-1],
+                               agg.surplus_at(p, 10))
+        mkt = Market(q, p, demand=1000-p, supply=10*p)
+        self.assertEqual(sampling.curve_of(mkt), (p, 1000-p))
+        self.assertEqual(sampling.curve_of(mkt, 'surplus'),
+                         (q, mkt.social_surplus()))
+
+    def test_errors(self):
+        sp.var('q p')
+        try:
+            sampling.sample(q + p, p, 0, 1)
+        except ValueError as e:
+            self.assertTrue('depends on more than p' in str(e))
+        else:
+            self.fail('ValueError not raised')
+
+    def test_export(self):
+        p = sp.Symbol('p')
+        curve = sampling.sample(100 - p, p, 0, 100, initial=3)
+        out = io.BytesIO()
+        curve.to_binary(out)
+        out.seek(0)
+        self.assertEqual(sampling.Curve.from_binary(out).points(),
+                         curve.points())
+        out = io.BytesIO()
+        curve.to_csv(out)
+        self.assertEqual(out.getvalue().splitlines()[:2],
+                         ['x,y', '0.0,100.0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
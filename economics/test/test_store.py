@@ -0,0 +1,59 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from economics.store import ResultStore
+
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_resume(self):
+        """Rows not yet in a completed chunk are lost in a crash, and
+        the run resumes after the last completed chunk.
+        """
+        store = ResultStore(self.path, ['p', 'q'], chunk_size=3)
+        for p in range(5):
+            store.append({'p': p, 'q': 2*p})
+        resumed = ResultStore(self.path)
+        self.assertEqual(len(resumed), 3)
+        evaluated = []
+        def evaluate(p):
+            evaluated.append(p)
+            return {'p': p, 'q': 2*p}
+        resumed.run(iter(range(8)), evaluate)
+        self.assertEqual(evaluated, [3, 4, 5, 6, 7])
+        self.assertEqual(list(resumed.column('q')), range(0, 16, 2))
+
+    def test_lazy_read(self):
+        with ResultStore(self.path, ['p'], chunk_size=4) as store:
+            for p in range(6):
+                store.append({'p': p})
+        chunks = list(ResultStore(self.path).chunks())
+        self.assertEqual([len(chunk['p']) for chunk in chunks], [4, 2])
+        self.assertTrue(isinstance(chunks[0]['p'], np.memmap))
+
+    def test_none(self):
+        """A market with no equilibrium does not end the run."""
+        store = ResultStore(self.path, ['p', 'q'])
+        store.run([None, 10], lambda p: {'p': p, 'q': p})
+        self.assertTrue(np.isnan(store.column('q')[0]))
+        self.assertEqual(store.column('q')[1], 10)
+
+    def test_columns(self):
+        ResultStore(self.path, ['p', 'q'])
+        self.assertRaises(ValueError, ResultStore, self.path, ['p'])
+        self.assertRaises(ValueError, ResultStore, self.path + '/missing')
+        self.assertRaises(ValueError, ResultStore, self.path, chunk_size=10)
+        self.assertEqual(len(ResultStore(self.path, chunk_size=65536)), 0)
+        self.assertRaises(ValueError, ResultStore, self.path + '/other',
+                          ['p', '../q'])
+
+
+if __name__ == '__main__':
+    unittest.main()